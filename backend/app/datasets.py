@@ -0,0 +1,64 @@
+"""Chargement partagé des CSV de données.
+
+Les deux consommateurs (l'app FastAPI pour /hotels et la route de
+recommandation pour le modèle) passent par ces fonctions mises en cache,
+de sorte que chaque CSV n'est analysé qu'une seule fois par processus.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parents[2] / 'data'
+
+
+def _read_csv(path, **kwargs):
+    """pd.read_csv avec le parseur PyArrow quand il est disponible."""
+    try:
+        return pd.read_csv(path, engine='pyarrow', **kwargs)
+    except (ImportError, ValueError):
+        return pd.read_csv(path, **kwargs)
+
+
+def _read_table(stem, **csv_kwargs):
+    """Lit <stem>.parquet s'il existe (layout columnar, catégories déjà
+    encodées — pas de re-tokenisation), sinon retombe sur <stem>.csv."""
+    parquet_path = DATA_DIR / f'{stem}.parquet'
+    if parquet_path.exists():
+        try:
+            return pd.read_parquet(parquet_path)
+        except Exception:
+            pass  # pyarrow absent ou fichier corrompu : on relit le CSV
+    return _read_csv(DATA_DIR / f'{stem}.csv', **csv_kwargs)
+
+
+@lru_cache(maxsize=None)
+def load_hotels() -> pd.DataFrame:
+    return _read_table('hotels')
+
+
+@lru_cache(maxsize=None)
+def load_ratings() -> pd.DataFrame:
+    # Dtypes explicites: ids en catégories (codes entiers prêts pour
+    # bincount), ratings en float32 — moitié moins de mémoire
+    df = _read_table(
+        'ratings',
+        dtype={'user_id': 'category', 'hotel_id': 'category', 'rating': 'float32'},
+    )
+    df['rating'] = df['rating'].astype('float32')
+    return df
+
+
+@lru_cache(maxsize=None)
+def load_users() -> pd.DataFrame:
+    return _read_table(
+        'users',
+        dtype={'user_id': 'category', 'type_voyage': 'category', 'budget': 'category'},
+    )
+
+
+def clear_caches():
+    """Vide les caches de chargement (après régénération des CSV, ou en test)."""
+    load_hotels.cache_clear()
+    load_ratings.cache_clear()
+    load_users.cache_clear()
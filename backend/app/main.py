@@ -1,53 +1,148 @@
+import re
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import os
+from fastapi.responses import Response
+
 from app.routes import recommendations
 
+try:
+    import orjson
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except Exception:
+    import json
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# Allow localhost and 127.0.0.1 on any port during local development
+_ORIGIN_RE = re.compile(r"http://localhost(:[0-9]+)?|http://127\.0\.0\.1(:[0-9]+)?")
+
+
+class CORSASGIMiddleware:
+    """Minimal pure-ASGI CORS middleware.
+
+    Avoids the per-request Request/Response object allocation of the
+    BaseHTTPMiddleware-style stack: preflight OPTIONS requests are answered
+    directly, and the access-control headers are appended in a send wrapper.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        origin = headers.get(b"origin", b"").decode("latin-1")
+        allowed = bool(origin and _ORIGIN_RE.fullmatch(origin))
+
+        cors_headers = []
+        if allowed:
+            cors_headers = [
+                (b"access-control-allow-origin", origin.encode("latin-1")),
+                (b"access-control-allow-credentials", b"true"),
+                (b"vary", b"Origin"),
+            ]
+
+        # Short-circuit preflight requests
+        if scope["method"] == "OPTIONS" and b"access-control-request-method" in headers:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": cors_headers + [
+                    (b"access-control-allow-methods", b"*"),
+                    (b"access-control-allow-headers", b"*"),
+                    (b"content-length", b"0"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and cors_headers:
+                message["headers"] = list(message.get("headers") or []) + cors_headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # pandas stays a lazy import so plain `import app.main` stays cheap
+    app.state.hotels_df = load_data()
+    # Serialize the payload once; /hotels then serves the cached bytes
+    # instead of paying to_dict + JSON encoding on every request
+    if app.state.hotels_df is not None:
+        app.state.hotels_records = app.state.hotels_df.to_dict(orient="records")
+        app.state.hotels_json = _json_dumps(app.state.hotels_records)
+        # Noms en minuscules précalculés : la recherche par sous-chaîne est
+        # une seule passe np.char.find au lieu d'un scan Python par requête
+        app.state.hotels_names_lower = (
+            app.state.hotels_df['nom'].astype(str).str.lower().to_numpy(dtype=str)
+        )
+    else:
+        app.state.hotels_records = None
+        app.state.hotels_json = None
+        app.state.hotels_names_lower = None
+    yield
+
 
 app = FastAPI(
     title="Hotel Recommendation API",
     description="API de recommandation d'hôtels à Marrakech",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 app.include_router(recommendations.router, prefix="/recommend")
 
 # CORS pour React
-app.add_middleware(
-    CORSMiddleware,
-    # Allow localhost and 127.0.0.1 on any port during local development
-    allow_origin_regex=r"http://localhost(:[0-9]+)?|http://127\.0\.0\.1(:[0-9]+)?",
-    allow_methods=["*"],
-    allow_headers=["*"],
-    allow_credentials=True,
-)
+app.add_middleware(CORSASGIMiddleware)
+
 
 # Charger les données
 def load_data():
-    # Calcule le chemin vers <project_root>/data indépendamment du cwd
+    # Passe par le chargeur partagé (mis en cache) : le CSV n'est analysé
+    # qu'une fois par processus, même si la route de recommandation le
+    # demande aussi
     try:
-        from pathlib import Path
-        project_root = Path(__file__).resolve().parents[2]
-        data_dir = project_root / 'data'
-        hotels_df = pd.read_csv(data_dir / 'hotels.csv')
-        return hotels_df
+        from app.datasets import load_hotels
+        return load_hotels()
     except Exception as e:
         print(f"Erreur lors du chargement des hotels.csv: {e}")
         return None
 
-hotels_df = load_data()
 
 @app.get("/")
 async def root():
     return {"message": "🏨 API Recommandation Hôtels Marrakech"}
 
+
 @app.get("/hotels")
 async def get_hotels():
-    if hotels_df is not None:
-        return hotels_df.to_dict(orient="records")
+    hotels_json = getattr(app.state, "hotels_json", None)
+    if hotels_json is not None:
+        return Response(content=hotels_json, media_type="application/json")
     else:
         return {"error": "Données non chargées"}
 
+
+@app.get("/hotels/search")
+async def search_hotels(q: str = ""):
+    names_lower = getattr(app.state, "hotels_names_lower", None)
+    if names_lower is None:
+        return {"error": "Données non chargées"}
+    q = q.strip().lower()
+    if not q:
+        return []
+    import numpy as np
+    hits = np.flatnonzero(np.char.find(names_lower, q) >= 0)
+    return [app.state.hotels_records[i] for i in hits]
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,88 @@
+"""Noyaux de similarité compilés (Numba) pour le chemin vectorisé.
+
+Numba reste optionnel : sans lui, les appelants retombent sur les
+équivalents scipy/BLAS, comme le fallback Faker du générateur de données.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except Exception:
+    _HAS_NUMBA = False
+
+
+if _HAS_NUMBA:
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def cosine_scores_csr(data, indices, indptr, row_norms, q_unit):
+        """Scores cosinus de chaque ligne CSR contre le vecteur unitaire q_unit.
+
+        Opère directement sur les tableaux (data, indices, indptr) d'une
+        csr_matrix float32 ; row_norms contient les normes L2 des lignes
+        (zéros remplacés par 1).
+        """
+        n_rows = indptr.shape[0] - 1
+        out = np.empty(n_rows, dtype=np.float32)
+        for i in prange(n_rows):
+            s = 0.0
+            for p in range(indptr[i], indptr[i + 1]):
+                s += data[p] * q_unit[indices[p]]
+            out[i] = s / row_norms[i]
+        return out
+
+    @njit(cache=True, fastmath=True)
+    def pearson_pair(a, b):
+        """Corrélation de Pearson de deux vecteurs 1-D en une boucle fusionnée.
+
+        Évite np.corrcoef (matrice 2x2 + temporaires) : moyennes, sommes
+        centrées et produit croisé accumulés en un seul passage.
+        """
+        n = a.shape[0]
+        ma = 0.0
+        mb = 0.0
+        for i in range(n):
+            ma += a[i]
+            mb += b[i]
+        ma /= n
+        mb /= n
+        sab = 0.0
+        saa = 0.0
+        sbb = 0.0
+        for i in range(n):
+            da = a[i] - ma
+            db = b[i] - mb
+            sab += da * db
+            saa += da * da
+            sbb += db * db
+        denom = np.sqrt(saa * sbb)
+        if denom == 0.0:
+            return 0.0
+        return sab / denom
+
+    @njit(cache=True, fastmath=True)
+    def euclidean_sq_pair(a, b):
+        """Somme des carrés des écarts, sans temporaires (a-b, (a-b)**2).
+
+        Huit accumulateurs partiels cassent la dépendance sérielle de
+        l'addition flottante, ce qui laisse LLVM émettre du SIMD sur le
+        corps de boucle déroulé.
+        """
+        n = a.shape[0]
+        acc = np.zeros(8, dtype=np.float64)
+        limite = n - (n % 8)
+        for i in range(0, limite, 8):
+            for j in range(8):
+                d = a[i + j] - b[i + j]
+                acc[j] += d * d
+        s = acc.sum()
+        for i in range(limite, n):
+            d = a[i] - b[i]
+            s += d * d
+        return s
+
+else:
+
+    cosine_scores_csr = None
+    pearson_pair = None
+    euclidean_sq_pair = None
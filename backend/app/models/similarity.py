@@ -4,9 +4,17 @@ Utilise différentes métriques de similarité pour le filtrage collaboratif
 """
 
 import numpy as np
-from scipy.spatial.distance import cosine
-from sklearn.metrics.pairwise import cosine_similarity
-import pandas as pd
+from scipy.sparse import csr_matrix
+
+from app.models._simkernel import cosine_scores_csr, euclidean_sq_pair, pearson_pair
+
+# SimSIMD fournit des noyaux cosinus SIMD (AVX/NEON) nettement plus
+# rapides que le produit scalaire NumPy ; purement opportuniste, NumPy
+# reste le repli si le paquet n'est pas installé
+try:
+    import simsimd as _simsimd
+except Exception:
+    _simsimd = None
 
 
 def cosine_similarity_users(user1_ratings, user2_ratings):
@@ -20,22 +28,33 @@ def cosine_similarity_users(user1_ratings, user2_ratings):
     Returns:
         float: Similarité cosinus entre 0 et 1
     """
-    # Trouver les hôtels communs
-    common_hotels = set(user1_ratings.keys()) & set(user2_ratings.keys())
-    
-    if len(common_hotels) == 0:
+    # Identité : cosinus de 1 sans aucun calcul
+    if user1_ratings is user2_ratings:
+        return 1.0 if user1_ratings else 0.0
+
+    # Trouver les hôtels communs en une passe sur le plus petit dict
+    # (pas de sets temporaires, une seule recherche par hôtel)
+    if len(user2_ratings) < len(user1_ratings):
+        user1_ratings, user2_ratings = user2_ratings, user1_ratings
+    common = [(r1, user2_ratings[h]) for h, r1 in user1_ratings.items() if h in user2_ratings]
+
+    if len(common) == 0:
         return 0.0
-        
+
     # Créer les vecteurs pour les hôtels communs
-    ratings1 = [user1_ratings[hotel] for hotel in common_hotels]
-    ratings2 = [user2_ratings[hotel] for hotel in common_hotels]
-    
-    # Calculer la similarité cosinus
-    try:
-        similarity = cosine_similarity([ratings1], [ratings2])[0][0]
-        return max(0.0, similarity)  # Assurer que c'est positif
-    except:
+    ratings1 = np.fromiter((r1 for r1, _ in common), dtype=np.float64, count=len(common))
+    ratings2 = np.fromiter((r2 for _, r2 in common), dtype=np.float64, count=len(common))
+
+    # Noyau SIMD quand SimSIMD est disponible (renvoie la distance cosinus)
+    if _simsimd is not None:
+        return max(0.0, 1.0 - float(_simsimd.cosine(ratings1, ratings2)))
+
+    # Cosinus en produits scalaires directs : np.vdot évite la validation
+    # de np.linalg.norm et un seul sqrt couvre les deux normes
+    denom_sq = np.vdot(ratings1, ratings1) * np.vdot(ratings2, ratings2)
+    if denom_sq == 0:
         return 0.0
+    return max(0.0, float(ratings1 @ ratings2 / np.sqrt(denom_sq)))
 
 
 def pearson_correlation(user1_ratings, user2_ratings):
@@ -49,23 +68,30 @@ def pearson_correlation(user1_ratings, user2_ratings):
     Returns:
         float: Corrélation de Pearson entre -1 et 1
     """
-    # Trouver les hôtels communs
-    common_hotels = set(user1_ratings.keys()) & set(user2_ratings.keys())
-    
-    if len(common_hotels) < 2:
+    # Trouver les hôtels communs en une passe, sans sets temporaires
+    if len(user2_ratings) < len(user1_ratings):
+        user1_ratings, user2_ratings = user2_ratings, user1_ratings
+    common = [(r1, user2_ratings[h]) for h, r1 in user1_ratings.items() if h in user2_ratings]
+
+    if len(common) < 2:
         return 0.0
-        
+
     # Créer les vecteurs pour les hôtels communs
-    ratings1 = [user1_ratings[hotel] for hotel in common_hotels]
-    ratings2 = [user2_ratings[hotel] for hotel in common_hotels]
-    
+    ratings1 = np.fromiter((r1 for r1, _ in common), dtype=np.float64, count=len(common))
+    ratings2 = np.fromiter((r2 for _, r2 in common), dtype=np.float64, count=len(common))
+
+    # Noyau Numba fusionné quand il est disponible : un seul passage,
+    # pas de matrice 2x2 np.corrcoef ni de temporaires
+    if pearson_pair is not None:
+        return float(pearson_pair(ratings1, ratings2))
+
     # Calculer la corrélation de Pearson
     correlation = np.corrcoef(ratings1, ratings2)[0, 1]
-    
+
     # Remplacer NaN par 0
     if np.isnan(correlation):
         return 0.0
-        
+
     return correlation
 
 
@@ -80,18 +106,32 @@ def euclidean_similarity(user1_ratings, user2_ratings):
     Returns:
         float: Similarité euclidienne normalisée entre 0 et 1
     """
-    # Trouver les hôtels communs
-    common_hotels = set(user1_ratings.keys()) & set(user2_ratings.keys())
-    
-    if len(common_hotels) == 0:
-        return 0.0
-        
-    # Calculer la distance euclidienne
-    sum_squares = sum([
-        (user1_ratings[hotel] - user2_ratings[hotel]) ** 2 
-        for hotel in common_hotels
-    ])
-    
+    # Distance euclidienne en une passe sur le plus petit dict,
+    # sans construire l'intersection au préalable
+    if len(user2_ratings) < len(user1_ratings):
+        user1_ratings, user2_ratings = user2_ratings, user1_ratings
+
+    if euclidean_sq_pair is not None:
+        # Noyau Numba : les notes communes sont rassemblées en deux
+        # tableaux, la somme des carrés est accumulée en code compilé
+        common = [(r1, user2_ratings[h]) for h, r1 in user1_ratings.items() if h in user2_ratings]
+        if len(common) == 0:
+            return 0.0
+        ratings1 = np.fromiter((r1 for r1, _ in common), dtype=np.float64, count=len(common))
+        ratings2 = np.fromiter((r2 for _, r2 in common), dtype=np.float64, count=len(common))
+        sum_squares = float(euclidean_sq_pair(ratings1, ratings2))
+    else:
+        n_common = 0
+        sum_squares = 0.0
+        for hotel, r1 in user1_ratings.items():
+            r2 = user2_ratings.get(hotel)
+            if r2 is not None:
+                sum_squares += (r1 - r2) ** 2
+                n_common += 1
+
+        if n_common == 0:
+            return 0.0
+
     # Normaliser la similarité (plus la distance est petite, plus la similarité est grande)
     # Utiliser 1 / (1 + distance) pour obtenir une valeur entre 0 et 1
     similarity = 1 / (1 + np.sqrt(sum_squares))
@@ -113,60 +153,104 @@ def jaccard_similarity(user1_ratings, user2_ratings, threshold=3.5):
         float: Similarité de Jaccard entre 0 et 1
     """
     # Hôtels aimés par chaque utilisateur
-    liked_by_user1 = set([hotel for hotel, rating in user1_ratings.items() if rating >= threshold])
-    liked_by_user2 = set([hotel for hotel, rating in user2_ratings.items() if rating >= threshold])
-    
-    # Intersection et union
+    liked_by_user1 = {hotel for hotel, rating in user1_ratings.items() if rating >= threshold}
+    liked_by_user2 = {hotel for hotel, rating in user2_ratings.items() if rating >= threshold}
+
+    # |union| déduit de |intersection| sans matérialiser l'union
     intersection = len(liked_by_user1 & liked_by_user2)
-    union = len(liked_by_user1 | liked_by_user2)
-    
+    union = len(liked_by_user1) + len(liked_by_user2) - intersection
+
     if union == 0:
         return 0.0
-        
+
     return intersection / union
 
 
+def cosine_similarity_matrix(A, B):
+    """
+    Calcule toutes les similarités cosinus entre les lignes de A et de B
+    en un seul produit matriciel BLAS (GEMM), au lieu d'une boucle Python
+    paire par paire
+
+    Args:
+        A (np.ndarray): Matrice (n_a x d), une ligne par vecteur
+        B (np.ndarray): Matrice (n_b x d), une ligne par vecteur
+
+    Returns:
+        np.ndarray: Matrice (n_a x n_b) des similarités cosinus
+    """
+    A = np.ascontiguousarray(A, dtype=np.float32)
+    B = np.ascontiguousarray(B, dtype=np.float32)
+    norms_a = np.linalg.norm(A, axis=1, keepdims=True)
+    norms_b = np.linalg.norm(B, axis=1, keepdims=True)
+    norms_a[norms_a == 0] = 1.0
+    norms_b[norms_b == 0] = 1.0
+    return (A / norms_a) @ (B / norms_b).T
+
+
+def build_centered_matrix(ratings_matrix):
+    """
+    Centre chaque ligne sur la moyenne de ses notes (entrées > 0) et la
+    normalise L2, de sorte que le cosinus ajusté entre deux utilisateurs
+    devienne un simple produit scalaire entre lignes
+
+    Args:
+        ratings_matrix (pd.DataFrame): Matrice utilisateur-item
+
+    Returns:
+        tuple: (matrice centrée-normalisée np.ndarray, dict user_id -> indice de ligne)
+    """
+    vals = ratings_matrix.to_numpy(dtype=np.float64)
+    mask = vals > 0
+    counts = mask.sum(axis=1)
+    means = np.where(counts > 0, vals.sum(axis=1) / np.maximum(counts, 1), 0.0)
+    centered = np.where(mask, vals - means[:, None], 0.0)
+    norms = np.linalg.norm(centered, axis=1)
+    norms[norms == 0] = 1.0
+    centered /= norms[:, None]
+    user_index = {uid: i for i, uid in enumerate(ratings_matrix.index)}
+    return centered, user_index
+
+
+# Cache de la dernière matrice centrée, pour que les appels répétés sur la
+# même matrice ne paient le centrage qu'une seule fois
+_centered_cache = {}
+
+
 def adjusted_cosine_similarity(ratings_matrix, user1_id, user2_id):
     """
     Calcule la similarité cosinus ajustée entre deux utilisateurs
     Soustrait la moyenne de chaque utilisateur pour normaliser
-    
+
+    La matrice centrée-normalisée est précalculée (et mise en cache), donc
+    chaque paire se réduit à un produit scalaire entre deux lignes.
+
     Args:
         ratings_matrix (pd.DataFrame): Matrice utilisateur-item
         user1_id: ID du premier utilisateur
         user2_id: ID du second utilisateur
-        
+
     Returns:
         float: Similarité cosinus ajustée
     """
-    if user1_id not in ratings_matrix.index or user2_id not in ratings_matrix.index:
-        return 0.0
-        
-    # Ratings des deux utilisateurs
-    user1_ratings = ratings_matrix.loc[user1_id]
-    user2_ratings = ratings_matrix.loc[user2_id]
-    
-    # Hôtels notés par les deux utilisateurs
-    common_mask = (user1_ratings > 0) & (user2_ratings > 0)
-    
-    if common_mask.sum() == 0:
-        return 0.0
-        
-    # Moyennes des utilisateurs (seulement pour les hôtels notés)
-    user1_mean = user1_ratings[user1_ratings > 0].mean()
-    user2_mean = user2_ratings[user2_ratings > 0].mean()
-    
-    # Ratings ajustés pour les hôtels communs
-    user1_adjusted = user1_ratings[common_mask] - user1_mean
-    user2_adjusted = user2_ratings[common_mask] - user2_mean
-    
-    # Calcul de la similarité cosinus
-    try:
-        similarity = cosine_similarity([user1_adjusted], [user2_adjusted])[0][0]
-        return max(0.0, similarity)
-    except:
+    key = id(ratings_matrix)
+    cached = _centered_cache.get(key)
+    # L'entrée garde une référence au DataFrame source : un id() peut être
+    # réattribué à un nouvel objet après garbage collection, donc on vérifie
+    # l'identité avant de réutiliser la matrice centrée
+    if cached is None or cached[0] is not ratings_matrix:
+        _centered_cache.clear()
+        cached = (ratings_matrix,) + build_centered_matrix(ratings_matrix)
+        _centered_cache[key] = cached
+    _, centered, user_index = cached
+
+    i = user_index.get(user1_id)
+    j = user_index.get(user2_id)
+    if i is None or j is None:
         return 0.0
 
+    return max(0.0, float(centered[i] @ centered[j]))
+
 
 class SimilarityCalculator:
     """
@@ -183,10 +267,51 @@ class SimilarityCalculator:
         self.method = method
         self.similarity_functions = {
             'cosine': cosine_similarity_users,
-            'pearson': pearson_correlation, 
+            'pearson': pearson_correlation,
             'euclidean': euclidean_similarity,
             'jaccard': jaccard_similarity
         }
+        # État du chemin vectorisé (méthode cosinus uniquement)
+        self._fitted_for = None
+        self._R = None
+        self._row_norms = None
+        self._fit_user_ids = None
+        self._hid_to_col = None
+
+    def fit(self, all_users_ratings):
+        """
+        Construit la matrice (utilisateurs x hôtels) une seule fois pour
+        le chemin vectorisé de find_most_similar_users
+
+        Args:
+            all_users_ratings (dict): Ratings de tous les utilisateurs {user_id: {hotel_id: rating}}
+        """
+        hotel_ids = sorted({h for ratings in all_users_ratings.values() for h in ratings})
+        self._hid_to_col = {hid: j for j, hid in enumerate(hotel_ids)}
+        self._fit_user_ids = list(all_users_ratings.keys())
+
+        # Construction CSR par triplets (codes entiers), plutôt qu'une
+        # matrice dense remplie en Python : float32 + mémoire ~ nombre de
+        # notes, pas utilisateurs x hôtels
+        n_ratings = sum(len(r) for r in all_users_ratings.values())
+        rows = np.empty(n_ratings, dtype=np.int32)
+        cols = np.empty(n_ratings, dtype=np.int32)
+        vals = np.empty(n_ratings, dtype=np.float32)
+        p = 0
+        for i, ratings in enumerate(all_users_ratings.values()):
+            for hid, rating in ratings.items():
+                rows[p] = i
+                cols[p] = self._hid_to_col[hid]
+                vals[p] = rating
+                p += 1
+        R = csr_matrix((vals, (rows, cols)),
+                       shape=(len(self._fit_user_ids), len(hotel_ids)), dtype=np.float32)
+
+        norms = np.sqrt(R.multiply(R).sum(axis=1)).A1.astype(np.float32)
+        norms[norms == 0] = 1.0
+        self._R = R
+        self._row_norms = norms
+        self._fitted_for = all_users_ratings
         
     def calculate_similarity(self, user1_ratings, user2_ratings):
         """
@@ -216,16 +341,45 @@ class SimilarityCalculator:
         Returns:
             list: Liste des utilisateurs similaires triés par similarité décroissante
         """
+        # Chemin vectorisé: un seul produit matrice-vecteur BLAS au lieu
+        # d'une boucle Python paire par paire (cosinus plein-vecteur,
+        # les hôtels non notés comptant pour 0)
+        if self.method == 'cosine':
+            if self._fitted_for is not all_users_ratings:
+                self.fit(all_users_ratings)
+
+            t = np.zeros(self._R.shape[1], dtype=np.float32)
+            for hid, rating in target_ratings.items():
+                col = self._hid_to_col.get(hid)
+                if col is not None:
+                    t[col] = rating
+            t_norm = np.linalg.norm(t)
+            if t_norm == 0:
+                sims = np.zeros(self._R.shape[0], dtype=np.float32)
+            elif cosine_scores_csr is not None:
+                sims = cosine_scores_csr(self._R.data, self._R.indices,
+                                         self._R.indptr, self._row_norms, t / t_norm)
+            else:
+                sims = (self._R @ (t / t_norm)) / self._row_norms
+
+            k_eff = min(k, sims.size)
+            top = np.argpartition(-sims, k_eff - 1)[:k_eff] if k_eff > 0 else []
+            top = sorted(top, key=lambda i: -sims[i])
+            return [
+                {'user_id': self._fit_user_ids[i], 'similarity': float(sims[i])}
+                for i in top
+            ]
+
         similarities = []
-        
+
         for user_id, user_ratings in all_users_ratings.items():
             similarity = self.calculate_similarity(target_ratings, user_ratings)
             similarities.append({
                 'user_id': user_id,
                 'similarity': similarity
             })
-            
+
         # Trier par similarité décroissante
         similarities.sort(key=lambda x: x['similarity'], reverse=True)
-        
+
         return similarities[:k]
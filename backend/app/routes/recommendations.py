@@ -1,9 +1,10 @@
+import threading
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Optional
-from pathlib import Path
-import pandas as pd
 
+from app.datasets import DATA_DIR, load_hotels, load_ratings
 from app.models.knn_recommender import HotelRecommender
 
 router = APIRouter()
@@ -19,24 +20,53 @@ class RecommendationRequest(BaseModel):
     user_id: Optional[str] = None
 
 
-# Load datasets once and initialize recommender
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest]
+
+
+# Load datasets once and initialize recommender. The lock prevents a burst
+# of concurrent cold-start requests from each parsing the CSVs and fitting
+# their own copy of the model.
 _RECOMMENDER: Optional[HotelRecommender] = None
+_RECOMMENDER_LOCK = threading.Lock()
 
 def _init_recommender():
     global _RECOMMENDER
     if _RECOMMENDER is not None:
         return _RECOMMENDER
+    with _RECOMMENDER_LOCK:
+        if _RECOMMENDER is not None:
+            return _RECOMMENDER
+        return _build_recommender()
+
+
+def _build_recommender():
+    global _RECOMMENDER
+    data_dir = DATA_DIR
+    csv_paths = [data_dir / 'hotels.csv', data_dir / 'users.csv', data_dir / 'ratings.csv']
+    cache_path = data_dir / 'model_cache.pkl'
+
+    # Reuse the persisted fit if it is newer than every source CSV —
+    # avoids re-parsing the CSVs and re-fitting in every worker process
+    try:
+        if cache_path.exists() and all(p.exists() for p in csv_paths):
+            if cache_path.stat().st_mtime > max(p.stat().st_mtime for p in csv_paths):
+                _RECOMMENDER = HotelRecommender.load(cache_path)
+                return _RECOMMENDER
+    except Exception:
+        pass  # cache corrompu ou illisible: on refait le fit depuis les CSV
 
-    project_root = Path(__file__).resolve().parents[3]
-    data_dir = project_root / 'data'
     try:
-        hotels_df = pd.read_csv(data_dir / 'hotels.csv')
-        users_df = pd.read_csv(data_dir / 'users.csv')
-        ratings_df = pd.read_csv(data_dir / 'ratings.csv')
+        hotels_df = load_hotels()
+        ratings_df = load_ratings()
     except Exception as e:
         raise RuntimeError(f"Impossible de charger les données depuis {data_dir}: {e}")
 
     _RECOMMENDER = HotelRecommender(hotels_df=hotels_df, ratings_df=ratings_df, k=5)
+    try:
+        _RECOMMENDER.save(cache_path)
+    except Exception:
+        pass  # cache best-effort: l'API fonctionne sans
     return _RECOMMENDER
 
 
@@ -56,5 +86,29 @@ async def get_recommendations(request: RecommendationRequest):
     try:
         recs = recommender.recommend(ratings, n_recommendations=5)
         return {"recommendations": recs}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur interne: {e}")
+
+
+@router.post("/batch")
+async def get_recommendations_batch(request: BatchRecommendationRequest):
+    try:
+        recommender = _init_recommender()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if len(request.requests) == 0:
+        raise HTTPException(status_code=400, detail="Veuillez fournir au moins une requête dans 'requests'.")
+
+    batch = [
+        [{"hotel_id": it.hotel_id, "rating": it.rating} for it in req.user_ratings]
+        for req in request.requests
+    ]
+    if any(len(ratings) == 0 for ratings in batch):
+        raise HTTPException(status_code=400, detail="Chaque requête doit contenir au moins une note dans 'user_ratings'.")
+
+    try:
+        results = recommender.recommend_batch(batch, n_recommendations=5)
+        return {"results": [{"recommendations": recs} for recs in results]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne: {e}")
\ No newline at end of file